@@ -1,8 +1,26 @@
 import csv
-from collections import defaultdict
 from datetime import datetime, timezone
 import argparse
+import heapq
+import io
 import math
+import mmap
+import multiprocessing
+import os
+import re
+from stat import S_ISREG
+import sys
+
+# Columns the analyzer reads from the CSV header
+CSV_COLUMNS = ('time', 'site', 'device', 'metric', 'value')
+
+# Buffer size for streamed (non-mmap) reads; the 8 KiB default means many
+# small read() calls on multi-hundred-MB sensor dumps
+READ_BUFFER_SIZE = 1 << 22
+
+# Bytes of CSV handed to each worker process when --jobs allows parallelism;
+# smaller files are aggregated in-process
+PARALLEL_CHUNK_SIZE = 1 << 26
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
@@ -44,8 +62,24 @@ def parse_arguments():
         help='Filter by end date/time (format: "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DD")'
     )
 
+    parser.add_argument(
+        '--sorted-by-time',
+        action='store_true',
+        help='Rows are in ascending time order; stop reading once past --end-date'
+    )
+
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='Number of worker processes for large files (default: number of CPUs)'
+    )
+
     args = parser.parse_args()
 
+    if args.jobs is not None and args.jobs < 1:
+        parser.error(f"Invalid jobs value: {args.jobs} (must be at least 1)")
+
     # Parse date strings to datetime objects if provided
     if args.start_date:
         try:
@@ -61,70 +95,211 @@ def parse_arguments():
     
     return args
 
+DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S %z %Z",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d"
+)
+
+# Sensor dumps repeat the same timestamp across devices, so parsed values are
+# cached by their raw string (bounded so huge files can't grow it forever)
+DATETIME_CACHE_SIZE = 65536
+_datetime_cache = {}
+
+# Index of the format that matched last; tried first on the next call
+_last_format_index = 0
+
+# The shapes the sensor CSVs actually use ("YYYY-MM-DD", "YYYY-MM-DD HH:MM:SS"
+# and the same with a " +0000 UTC" suffix), all UTC, parsed without strptime
+_UTC_TIMESTAMP_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})(?: (\d{2}):(\d{2}):(\d{2})(?: \+0000 UTC)?)?',
+    re.ASCII
+)
+
 def parse_datetime(date_str):
-    formats = [
-        "%Y-%m-%d %H:%M:%S %z %Z",
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d"
-    ]
+    global _last_format_index
+
+    dt = _datetime_cache.get(date_str)
+    if dt is not None:
+        return dt
+
+    if len(_datetime_cache) >= DATETIME_CACHE_SIZE:
+        _datetime_cache.clear()
 
-    for fmt in formats:
+    # Fast path: pull the numeric fields out with a regex; anything it or the
+    # datetime constructor rejects falls through to strptime
+    match = _UTC_TIMESTAMP_RE.fullmatch(date_str)
+    if match is not None:
         try:
-            dt = datetime.strptime(date_str, fmt)
-            # Ensure timezone-aware (UTC) for consistent comparisons
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
+            dt = datetime(*[int(field) for field in match.groups('0')], tzinfo=timezone.utc)
+        except ValueError:
+            pass
+        else:
+            _datetime_cache[date_str] = dt
             return dt
+
+    count = len(DATETIME_FORMATS)
+    for offset in range(count):
+        index = (_last_format_index + offset) % count
+        try:
+            dt = datetime.strptime(date_str, DATETIME_FORMATS[index])
         except ValueError:
             continue
+
+        # Ensure timezone-aware (UTC) for consistent comparisons
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+
+        _last_format_index = index
+        _datetime_cache[date_str] = dt
+        return dt
     
     raise ValueError(f"Unable to parse date string: {date_str}")
 
 def should_include(row, args):
+    return matches_filters(row.get('time'), row['site'], row['device'], row['metric'], args)
+
+def matches_filters(time, site, device, metric, args):
+    return matches_key(site, device, metric, args) and matches_time(time, args)
+
+def matches_key(site, device, metric, args):
     # Filter by site
-    if args.site and row['site'] != args.site:
+    if args.site and site != args.site:
         return False
     
     # Filter by device
-    if args.device and row['device'] != args.device:
+    if args.device and device != args.device:
         return False
     
     # Filter by metric
-    if args.metric and row['metric'] != args.metric:
+    if args.metric and metric != args.metric:
         return False
-    
+
+    return True
+
+def matches_time(time, args):
     # Filter by date range
     if args.start_date or args.end_date:
         try:
-            row_time = parse_datetime(row['time'].strip())
+            row_time = parse_datetime(time.strip())
             
             if args.start_date and row_time < args.start_date:
                 return False
             
             if args.end_date and row_time > args.end_date:
                 return False
-        except (ValueError, KeyError):
+        except (ValueError, AttributeError):
             # If we can't parse the time, skip this row or include it
             # For robustness, we'll skip rows with unparseable dates
             return False
     
     return True
 
+def time_sort_key(dt):
+    # Render a datetime as the UTC "YYYY-MM-DD HH:MM:SS" prefix of the CSV
+    # timestamps, which orders correctly as a plain string. The fields are
+    # padded by hand: strftime('%Y') doesn't zero-pad years before 1000 on
+    # every platform
+    d = dt.astimezone(timezone.utc)
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}:{d.second:02d}"
+
+def is_utc_timestamp(time):
+    # True for "YYYY-MM-DD HH:MM:SS" with an optional " +0000 UTC" suffix,
+    # i.e. timestamps whose first 19 characters compare chronologically
+    length = len(time)
+    return (
+        (length == 19 or (length == 29 and time.endswith(' +0000 UTC')))
+        and time[4] == '-' and time[7] == '-' and time[10] == ' '
+        and time[13] == ':' and time[16] == ':'
+    )
+
+def build_time_filter(args):
+    # Date-range check on the raw time field; None without date filters
+    if not (args.start_date or args.end_date):
+        return None
+
+    start_key = time_sort_key(args.start_date) if args.start_date else None
+    end_key = time_sort_key(args.end_date) if args.end_date else None
+
+    def time_filter(time):
+        # Decide UTC timestamps by string comparison; anything else goes
+        # through the general strip-and-parse path in matches_time()
+        if not is_utc_timestamp(time):
+            return matches_time(time, args)
+
+        prefix = time[:19]
+        if start_key and prefix < start_key:
+            return False
+        if end_key and prefix > end_key:
+            return False
+
+        # In range as a string, so only validity is left to check: parse so
+        # malformed timestamps are still excluded. The shape check already
+        # rules out surrounding whitespace, so no strip() copy is needed
+        try:
+            parse_datetime(time)
+        except ValueError:
+            return False
+        return True
+
+    return time_filter
+
+def build_past_end_check(args):
+    # For input sorted by time: detects the first row after --end-date, past
+    # which nothing else can match. None unless both are requested
+    if not (getattr(args, 'sorted_by_time', False) and args.end_date):
+        return None
+
+    end_key = time_sort_key(args.end_date)
+
+    def past_end(time):
+        if is_utc_timestamp(time):
+            return time[:19] > end_key
+        try:
+            return parse_datetime(time.strip()) > args.end_date
+        except ValueError:
+            # Unparseable rows say nothing about where the range ends
+            return False
+
+    return past_end
+
+def build_row_filter(args):
+    # Select the filter once up front: None when no filters are active, so
+    # the full-scan path never calls into matches_filters()
+    if not (args.site or args.device or args.metric or args.start_date or args.end_date):
+        return None
+
+    time_filter = build_time_filter(args)
+
+    def row_filter(time, site, device, metric):
+        if not matches_key(site, device, metric, args):
+            return False
+        return time_filter is None or time_filter(time)
+
+    return row_filter
+
 def convert_to_float(value_str):
-    if value_str is None or value_str.strip() == '':
+    # float() already ignores surrounding whitespace and rejects blank
+    # strings, so no strip() copies are needed
+    if value_str is None:
         return None
     
     try:
-        return float(value_str.strip())
+        return float(value_str)
     except (ValueError, TypeError):
         # Log warning would go here in production
         return None
 
-def compute_statistics(values):
-    # Filter out None values
-    valid_values = [v for v in values if v is not None]
-    
-    if len(valid_values) == 0:
+def _moments(values):
+    # Reduce a non-empty group to (count, mean, M2, min, max), where M2 is the
+    # sum of squared deviations from the mean
+    count = len(values)
+    mean = sum(values) / count
+    m2 = sum((x - mean) ** 2 for x in values)
+    return count, mean, m2, min(values), max(values)
+
+def statistics_from_moments(count, mean, m2, min_value, max_value):
+    if count == 0:
         return {
             'average': 0,
             'min': 0.0,
@@ -132,106 +307,394 @@ def compute_statistics(values):
             'count': 0,
             'std_dev': 0.0
         }
-    
-    # Basic statistics
-    count = len(valid_values)
-    average = sum(valid_values) / count
-    min_value = min(valid_values)
-    max_value = max(valid_values)
-    
+
     # Standard deviation
     if count == 1:
         std_dev = 0.0
     else:
-        variance = sum((x - average) ** 2 for x in valid_values) / count
-        std_dev = math.sqrt(variance)
-    
+        std_dev = math.sqrt(m2 / count)
+
     return {
-        'average': average,
+        'average': mean,
         'min': min_value,
         'max': max_value,
         'count': count,
         'std_dev': std_dev
     }
 
+def merge_accumulators(accumulators, partial):
+    # Combine per-group [count, total, M2, min, max] states from another part
+    # of the file using Chan et al.'s pairwise variance update
+    for key, (count, total, m2, min_value, max_value) in partial.items():
+        acc = accumulators.get(key)
+        if acc is None:
+            accumulators[key] = [count, total, m2, min_value, max_value]
+            continue
+
+        n = acc[0] + count
+        delta = total / count - acc[1] / acc[0]
+        acc[2] += m2 + delta * delta * acc[0] * count / n
+        acc[1] += total
+        if min_value < acc[3]:
+            acc[3] = min_value
+        if max_value > acc[4]:
+            acc[4] = max_value
+        acc[0] = n
+
+    return accumulators
+
+def add_value(accumulators, key, value):
+    # Fold one reading into the running [count, total, M2, min, max] of its
+    # group using Welford's online update; the mean is kept as total / count
+    # so averages match a plain sum over the readings
+    acc = accumulators.get(key)
+    if acc is None:
+        accumulators[key] = [1, value, 0.0, value, value]
+        return
+
+    count = acc[0] + 1
+    mean = acc[1] / acc[0]
+    total = acc[1] + value
+    acc[2] += (value - mean) * (value - total / count)
+    acc[1] = total
+    if value < acc[3]:
+        acc[3] = value
+    if value > acc[4]:
+        acc[4] = value
+    acc[0] = count
+
+def compute_statistics(values):
+    # Filter out None values
+    valid_values = [v for v in values if v is not None]
+    
+    if len(valid_values) == 0:
+        return statistics_from_moments(0, 0.0, 0.0, 0.0, 0.0)
+    
+    return statistics_from_moments(*_moments(valid_values))
+
+def select_top_groups(stats, n):
+    # Top n (key, stat) items by average and by std dev. nlargest keeps a
+    # bounded heap instead of sorting every group, evaluates each key once
+    # and ranks ties in insertion order like sorted(); two calls measured
+    # the same as a single Python-level pass feeding both heaps
+    return (
+        heapq.nlargest(n, stats.items(), key=lambda x: x[1]['average']),
+        heapq.nlargest(n, stats.items(), key=lambda x: x[1]['std_dev'])
+    )
+
 def print_aggregation_results(stats):
-    # Print formatted aggregation results for all device+site+metric combinations
-    print(f"{'Device':<20} {'Site':<10} {'Metric':<15} {'Avg':>10} {'Min':>10} {'Max':>10} {'Count':>8} {'StdDev':>10}")
-    print("-" * 100)
+    # Print formatted aggregation results for all device+site+metric combinations;
+    # lines are joined and written once instead of one print() per group
+    lines = [
+        f"{'Device':<20} {'Site':<10} {'Metric':<15} {'Avg':>10} {'Min':>10} {'Max':>10} {'Count':>8} {'StdDev':>10}",
+        "-" * 100
+    ]
     
     for key, stat in sorted(stats.items()):
-        print(f"{stat['device']:<20} {stat['site']:<10} {stat['metric']:<15} "
-              f"{stat['average']:>10.2f} {stat['min']:>10.2f} {stat['max']:>10.2f} "
-              f"{stat['count']:>8} {stat['std_dev']:>10.2f}")
+        lines.append(
+            f"{stat['device']:<20} {stat['site']:<10} {stat['metric']:<15} "
+            f"{stat['average']:>10.2f} {stat['min']:>10.2f} {stat['max']:>10.2f} "
+            f"{stat['count']:>8} {stat['std_dev']:>10.2f}"
+        )
+
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def print_top_10_by_average(top_10):
     # Print top 10 device+site+metric combinations by average value
-    print(f"{'Rank':<6} {'Device':<20} {'Site':<10} {'Metric':<15} {'Average':>10}")
-    print("-" * 65)
+    lines = [
+        f"{'Rank':<6} {'Device':<20} {'Site':<10} {'Metric':<15} {'Average':>10}",
+        "-" * 65
+    ]
     
     for rank, (key, stat) in enumerate(top_10, 1):
-        print(f"{rank:<6} {stat['device']:<20} {stat['site']:<10} {stat['metric']:<15} {stat['average']:>10.2f}")
+        lines.append(f"{rank:<6} {stat['device']:<20} {stat['site']:<10} {stat['metric']:<15} {stat['average']:>10.2f}")
+
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def print_top_10_by_stddev(top_10):
     # Print top 10 device+site+metric combinations by standard deviation
-    print(f"{'Rank':<6} {'Device':<20} {'Site':<10} {'Metric':<15} {'StdDev':>10}")
-    print("-" * 65)
+    lines = [
+        f"{'Rank':<6} {'Device':<20} {'Site':<10} {'Metric':<15} {'StdDev':>10}",
+        "-" * 65
+    ]
     
     for rank, (key, stat) in enumerate(top_10, 1):
-        print(f"{rank:<6} {stat['device']:<20} {stat['site']:<10} {stat['metric']:<15} {stat['std_dev']:>10.2f}")
+        lines.append(f"{rank:<6} {stat['device']:<20} {stat['site']:<10} {stat['metric']:<15} {stat['std_dev']:>10.2f}")
 
-def main():
-    # Parse command-line arguments
-    args = parse_arguments()
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+def resolve_columns(header, args):
+    # Positions of the columns the analyzer reads, plus the number of fields
+    # a row needs to reach all of them; unused trailing columns may be
+    # missing. The time column is only required when a date filter needs
+    # it; its position is None otherwise
+    names = CSV_COLUMNS if (args.start_date or args.end_date) else CSV_COLUMNS[1:]
+    positions = {name: header.index(name) for name in names}
+    return (
+        positions.get('time'),
+        positions['site'],
+        positions['device'],
+        positions['metric'],
+        positions['value'],
+        max(positions.values()) + 1
+    )
 
+def aggregate_file(input_file, args, jobs=1, chunk_size=PARALLEL_CHUNK_SIZE):
     # Initialize aggregation data structure 
     # where Key is (device, site, metric) 
-    # and Value is list of numeric values
-    aggregations = defaultdict(list)
+    # and Value is the running [count, total, M2, min, max] of the group,
+    # so memory scales with the number of groups, not readings
+    accumulators = {}
+
+    # Pipes and other non-regular files (e.g. <(zcat dump.csv.gz)) can't be
+    # mapped and report a size of 0, so stream them through the csv module
+    if not S_ISREG(os.stat(input_file).st_mode):
+        return _aggregate_csv_rows(input_file, args, accumulators)
+
+    with open(input_file, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return accumulators
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # The file is scanned once front to back; let the kernel read ahead
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+
+            # Resolve column positions once from the header; utf-8-sig drops
+            # the byte-order mark that spreadsheet exports put in front
+            header_line = mm.readline().decode('utf-8-sig')
+
+            # Lines are split on b'\n' only; a file with bare \r line endings
+            # reads as a single header line, so hand it to the csv module
+            if '\r' in header_line.rstrip('\r\n'):
+                return _aggregate_csv_rows(input_file, args, accumulators)
+
+            header = next(csv.reader([header_line]), [])
+            columns = resolve_columns(header, args)
+            body_start = mm.tell()
+
+            ranges = _chunk_ranges(mm, body_start, size, chunk_size) if jobs > 1 else []
+            if len(ranges) > 1:
+                # Chunks are independent, so aggregate them in worker
+                # processes and merge the partial results in file order
+                with multiprocessing.Pool(min(jobs, len(ranges))) as pool:
+                    partials = pool.starmap(
+                        _aggregate_chunk,
+                        [(input_file, start, end, columns, args) for start, end in ranges]
+                    )
+
+                if None not in partials:
+                    for partial in partials:
+                        merge_accumulators(accumulators, partial)
+                    return accumulators
+
+                # A quoted field with a line break straddles a chunk
+                # boundary; redo the file in a single pass instead
+                mm.seek(body_start)
+
+            return _aggregate_lines(iter(mm.readline, b''), columns, args, accumulators)
+
+def _chunk_ranges(mm, start, size, chunk_size):
+    # Split [start, size) into byte ranges of roughly chunk_size that each
+    # begin at the start of a line
+    ranges = []
+    while start < size:
+        end = mm.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def _aggregate_chunk(input_file, start, end, columns, args):
+    # Worker entry point: aggregate the lines in one byte range of the file
+    with open(input_file, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunk = mm[start:end]
+    return _aggregate_lines(io.BytesIO(chunk), columns, args, {}, multiline_records=False)
+
+def _split_quoted_record(line, lines, multiline_records):
+    # Split a line containing quotes with the csv module, which handles
+    # commas and escaped quotes inside quoted fields. The reader pulls
+    # further lines only while a quoted field is still open, so a stray
+    # quote inside an unquoted field stays on its own line; returns None
+    # when a record spans lines but that isn't allowed (a chunk boundary
+    # may cut such a record in two)
+    def decoded():
+        yield line.decode('utf-8')
+        for more in lines:
+            yield more.decode('utf-8')
+
+    reader = csv.reader(decoded())
+    fields = next(reader, [])
+    if reader.line_num > 1 and not multiline_records:
+        return None
+    return [field.encode('utf-8') for field in fields]
+
+def _aggregate_lines(lines, columns, args, accumulators, multiline_records=True):
+    i_time, i_site, i_device, i_metric, i_value, width = columns
+
+    # Site/device/metric filters depend only on the group, so they are
+    # evaluated once per distinct key; only the date range is checked per row
+    filter_keys = args.site or args.device or args.metric
+    time_filter = build_time_filter(args)
+    past_end = build_past_end_check(args)
+
+    # Raw (device, site, metric) bytes -> (decoded interned key, passes the
+    # key filters); the universe of groups is small, so each is decoded only
+    # once and every row of a group shares the same key objects
+    keys = {}
+
+    # Bind the per-row method lookups to locals once
+    keys_get = keys.get
+    accumulators_get = accumulators.get
+    intern = sys.intern
+
+    # Sensor dumps are often grouped by device, so consecutive rows
+    # tend to share a key; remember the last group's key and
+    # accumulator to skip both dict lookups while a run lasts
+    last_raw_key = None
+    acc = None
+
+    # Testing for a single byte value is much cheaper than a b'"' substring
+    # search, and nearly every line has no quotes at all
+    quote = ord('"')
+
+    # Process the file line-by-line, splitting raw bytes
+    for line in lines:
+        if quote in line:
+            parts = _split_quoted_record(line, lines, multiline_records)
+            if parts is None:
+                return None
+        else:
+            # Drop the line terminator first so it can't end up in whichever
+            # column happens to be last
+            parts = line.rstrip(b'\r\n').split(b',')
+        if len(parts) < width:
+            # Blank or truncated line
+            continue
+
+        raw_key = (parts[i_device], parts[i_site], parts[i_metric])
+        if raw_key != last_raw_key:
+            entry = keys_get(raw_key)
+            if entry is None:
+                key = tuple(intern(field.decode('utf-8')) for field in raw_key)
+                keep = not filter_keys or matches_key(key[1], key[0], key[2], args)
+                entry = keys[raw_key] = (key, keep)
+            key, keep = entry
+            last_raw_key = raw_key
+            acc = accumulators_get(key)
+
+        # Apply filters
+        if not keep:
+            continue
+        if time_filter is not None:
+            time = parts[i_time].decode('utf-8')
+            if not time_filter(time):
+                # On time-sorted input every later row is out of range too
+                if past_end is not None and past_end(time):
+                    break
+                continue
+
+        # float() accepts bytes and ignores surrounding whitespace
+        try:
+            value = float(parts[i_value])
+        except ValueError:
+            continue
+
+        # Welford update, inlined from add_value() for the hot loop
+        if acc is None:
+            acc = accumulators[key] = [1, value, 0.0, value, value]
+            continue
+
+        count = acc[0] + 1
+        mean = acc[1] / acc[0]
+        total = acc[1] + value
+        acc[2] += (value - mean) * (value - total / count)
+        acc[1] = total
+        if value < acc[3]:
+            acc[3] = value
+        if value > acc[4]:
+            acc[4] = value
+        acc[0] = count
+
+    return accumulators
+
+def _aggregate_csv_rows(input_file, args, accumulators):
+    row_filter = build_row_filter(args)
+    past_end = build_past_end_check(args)
 
     # Process CSV file line-by-line
-    try:
-        with open(args.input_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                # Apply filters
-                if should_include(row, args):
-                    key = (row['device'], row['site'], row['metric'])
-                    value = convert_to_float(row['value'])
-
-                    if value is not None:
-                        aggregations[key].append(value)
-    
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        return
-    
+    with open(input_file, 'r', encoding='utf-8-sig', newline='', buffering=READ_BUFFER_SIZE) as file:
+        # Plain csv.reader with column positions resolved once from the
+        # header; DictReader would build a dict for every row
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return accumulators
+
+        i_time, i_site, i_device, i_metric, i_value, width = resolve_columns(header, args)
+
+        for row in reader:
+            if len(row) < width:
+                # Blank or truncated line
+                continue
+
+            # Apply filters
+            if row_filter is not None and not row_filter(
+                row[i_time] if i_time is not None else None,
+                row[i_site], row[i_device], row[i_metric]
+            ):
+                # On time-sorted input every later row is out of range too
+                if past_end is not None and past_end(row[i_time]):
+                    break
+                continue
+
+            value = convert_to_float(row[i_value])
+
+            if value is not None:
+                key = (
+                    sys.intern(row[i_device]),
+                    sys.intern(row[i_site]),
+                    sys.intern(row[i_metric])
+                )
+                add_value(accumulators, key, value)
+
+    return accumulators
+
+def compute_group_stats(accumulators):
     # Calcualte stats for each aggregated group
     stats = {}
-    for key, values in aggregations.items():
+    for key, (count, total, m2, min_value, max_value) in accumulators.items():
         device, site, metric = key
         stats[key] = {
             'device': device,
             'site': site,
             'metric': metric,
-            **compute_statistics(values)
+            **statistics_from_moments(count, total / count, m2, min_value, max_value)
         }
+    return stats
+
+def main():
+    # Parse command-line arguments
+    args = parse_arguments()
+
+    try:
+        accumulators = aggregate_file(
+            args.input_file,
+            args,
+            jobs=args.jobs if args.jobs is not None else (os.cpu_count() or 1)
+        )
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        return
+    
+    stats = compute_group_stats(accumulators)
 
-    # Get top 10 by average value
-    top_by_avg = sorted(
-        stats.items(),
-        key=lambda x: x[1]['average'],
-        reverse=True
-    )[:10]
-
-    # Get top 10 by standard deviation
-    top_by_stddev = sorted(
-        stats.items(),
-        key=lambda x: x[1]['std_dev'],
-        reverse=True
-    )[:10]
+    # Get top 10 by average value and by standard deviation
+    top_by_avg, top_by_stddev = select_top_groups(stats, 10)
 
     # Output results
     print('\n')
@@ -1,7 +1,11 @@
 import math
+import os
+import threading
 from types import SimpleNamespace
 from collections import defaultdict
 
+import pytest
+
 import analyzer
 
 
@@ -78,3 +82,334 @@ def test_end_to_end_small_csv(tmp_path):
     assert s2['average'] == 52.5
     # values: [50,55] -> variance = ((-2.5)^2 + 2.5^2)/2 = 6.25
     assert math.isclose(s2['std_dev'], math.sqrt(6.25), rel_tol=1e-9)
+
+
+def test_aggregate_file_groups_and_filters(tmp_path):
+    csv_text = (
+        "time,site,device,metric,unit,value\n"
+        "2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,Cel,10.0\n"
+        "2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,Cel,\n"
+        "2025-01-01 00:10:00 +0000 UTC,site_1,dev_1,temp,Cel,abc\n"
+        "2025-01-01 00:15:00 +0000 UTC,site_1,dev_1,temp,Cel,30.0\n"
+        "2025-01-01 00:00:00 +0000 UTC,site_2,dev_2,humidity,%RH,50.0\n"
+    )
+    csv_path = tmp_path / "mini.csv"
+    csv_path.write_text(csv_text, encoding="utf-8")
+
+    args = SimpleNamespace(site='site_1', device=None, metric=None, start_date=None, end_date=None)
+    stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(csv_path), args))
+
+    assert list(stats) == [('dev_1', 'site_1', 'temp')]
+    s = stats[('dev_1', 'site_1', 'temp')]
+    assert s['count'] == 2
+    assert s['average'] == 20.0
+    assert s['device'] == 'dev_1'
+
+
+def test_parse_datetime_formats_and_cache():
+    with_tz = analyzer.parse_datetime("2025-01-01 00:05:00 +0000 UTC")
+    plain = analyzer.parse_datetime("2025-01-01 00:05:00")
+    date_only = analyzer.parse_datetime("2025-01-01")
+
+    assert with_tz == plain
+    assert plain.tzinfo is not None
+    assert date_only.hour == 0 and date_only.tzinfo is not None
+    # repeated strings are served from the cache
+    assert analyzer.parse_datetime("2025-01-01 00:05:00") is plain
+
+    with pytest.raises(ValueError):
+        analyzer.parse_datetime("not a date")
+
+
+def test_aggregate_file_crlf_and_quoted_fields(tmp_path):
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+
+    plain = tmp_path / "crlf.csv"
+    plain.write_bytes(
+        b"time,site,device,metric,unit,value\r\n"
+        b"2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,Cel,10.0\r\n"
+        b"\r\n"
+        b"2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,Cel,20.0\r\n"
+    )
+    quoted = tmp_path / "quoted.csv"
+    quoted.write_text(
+        'time,site,device,metric,unit,value\n'
+        '2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,"deg,C",10.0\n'
+        '2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,"deg,C",20.0\n',
+        encoding="utf-8",
+    )
+    empty = tmp_path / "empty.csv"
+    empty.write_bytes(b"")
+
+    for path in (plain, quoted):
+        stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(path), args))
+        assert stats[('dev_1', 'site_1', 'temp')]['average'] == 15.0
+        assert stats[('dev_1', 'site_1', 'temp')]['count'] == 2
+
+    assert analyzer.aggregate_file(str(empty), args) == {}
+
+
+def test_aggregate_file_reads_from_pipe(tmp_path):
+    csv_text = (
+        "time,site,device,metric,unit,value\n"
+        "2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,Cel,10.0\n"
+        "2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,Cel,20.0\n"
+    )
+    fifo_path = tmp_path / "pipe.csv"
+    os.mkfifo(fifo_path)
+
+    def write():
+        with open(fifo_path, 'w', encoding='utf-8') as f:
+            f.write(csv_text)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    try:
+        stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(fifo_path), args))
+    finally:
+        writer.join()
+
+    assert stats[('dev_1', 'site_1', 'temp')]['count'] == 2
+    assert stats[('dev_1', 'site_1', 'temp')]['average'] == 15.0
+
+
+def test_aggregate_file_reordered_header(tmp_path):
+    csv_path = tmp_path / "reordered.csv"
+    csv_path.write_bytes(
+        b"time,site,device,value,unit,metric\r\n"
+        b"2025-01-01 00:00:00 +0000 UTC,s1,d1,10.0,Cel,temp\r\n"
+        b"2025-01-01 00:05:00 +0000 UTC,s1,d1,20.0,Cel,temp\n"
+    )
+
+    args = SimpleNamespace(site=None, device=None, metric='temp', start_date=None, end_date=None)
+    stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(csv_path), args))
+
+    assert list(stats) == [('d1', 's1', 'temp')]
+    assert stats[('d1', 's1', 'temp')]['count'] == 2
+
+
+def test_aggregate_file_bom_and_optional_time_column(tmp_path):
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+
+    bom = tmp_path / "bom.csv"
+    bom.write_bytes(
+        b"\xef\xbb\xbftime,site,device,metric,unit,value\n"
+        b"2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,Cel,10.0\n"
+    )
+    bom_quoted = tmp_path / "bom_quoted.csv"
+    bom_quoted.write_bytes(
+        b"\xef\xbb\xbftime,site,device,metric,unit,value\n"
+        b'2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,"deg,C",10.0\n'
+    )
+    no_time = tmp_path / "no_time.csv"
+    no_time.write_bytes(b"site,device,metric,value\nsite_1,dev_1,temp,10.0\n")
+
+    for path in (bom, bom_quoted, no_time):
+        stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(path), args))
+        assert stats[('dev_1', 'site_1', 'temp')]['count'] == 1
+
+    args.start_date = analyzer.parse_datetime("2025-01-01")
+    stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(bom), args))
+    assert stats[('dev_1', 'site_1', 'temp')]['count'] == 1
+    with pytest.raises(ValueError):
+        analyzer.aggregate_file(str(no_time), args)
+
+
+def test_aggregate_file_quoted_records_with_line_breaks(tmp_path):
+    lines = ["time,site,device,metric,unit,value"]
+    for i in range(200):
+        unit = '"deg\nC"' if i % 50 == 0 else ('"deg,C"' if i % 7 == 0 else 'Cel')
+        lines.append(f"2025-01-01 00:{i % 60:02d}:00 +0000 UTC,site_1,dev_{i % 3},temp,{unit},{i}")
+    csv_path = tmp_path / "multiline.csv"
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    serial = analyzer.aggregate_file(str(csv_path), args)
+    # small chunks cut some quoted records in two, forcing the single-pass redo
+    parallel = analyzer.aggregate_file(str(csv_path), args, jobs=2, chunk_size=512)
+    stats = analyzer.compute_group_stats(serial)
+
+    for d in range(3):
+        readings = [i for i in range(200) if i % 3 == d]
+        assert stats[(f'dev_{d}', 'site_1', 'temp')]['count'] == len(readings)
+        assert stats[(f'dev_{d}', 'site_1', 'temp')]['average'] == sum(readings) / len(readings)
+    assert parallel == serial
+
+
+def test_aggregate_file_stray_quote_in_unquoted_field(tmp_path):
+    csv_path = tmp_path / "stray.csv"
+    csv_path.write_text(
+        'time,site,device,metric,unit,value\n'
+        '2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,depth,in",10.0\n'
+        '2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,depth,in,20.0\n'
+        '2025-01-01 00:10:00 +0000 UTC,site_1,dev_1,depth,in,30.0\n',
+        encoding="utf-8",
+    )
+
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    serial = analyzer.aggregate_file(str(csv_path), args)
+    parallel = analyzer.aggregate_file(str(csv_path), args, jobs=2, chunk_size=64)
+    stats = analyzer.compute_group_stats(serial)
+
+    assert stats[('dev_1', 'site_1', 'depth')]['count'] == 3
+    assert stats[('dev_1', 'site_1', 'depth')]['average'] == 20.0
+    assert parallel == serial
+
+
+def test_aggregate_file_rows_missing_unused_trailing_columns(tmp_path):
+    rows = [
+        "time,site,device,metric,value,notes",
+        "2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,10.0,ok",
+        "2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,20.0",
+        "2025-01-01 00:10:00 +0000 UTC,site_1,dev_1",
+    ]
+    lf = tmp_path / "notes_lf.csv"
+    lf.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    # bare \r line endings go through the csv.reader path
+    cr = tmp_path / "notes_cr.csv"
+    cr.write_text("\r".join(rows) + "\r", encoding="utf-8", newline="")
+
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    for path in (lf, cr):
+        stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(path), args))
+        assert stats[('dev_1', 'site_1', 'temp')]['count'] == 2
+
+
+def test_aggregate_file_cr_line_endings(tmp_path):
+    csv_path = tmp_path / "cr.csv"
+    csv_path.write_bytes(
+        b"time,site,device,metric,unit,value\r"
+        b"2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,Cel,10.0\r"
+        b"2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,Cel,20.0\r"
+    )
+
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    stats = analyzer.compute_group_stats(analyzer.aggregate_file(str(csv_path), args))
+
+    assert stats[('dev_1', 'site_1', 'temp')]['count'] == 2
+    assert stats[('dev_1', 'site_1', 'temp')]['average'] == 15.0
+
+
+def test_add_value_matches_compute_statistics():
+    values = [12.5, 9.0, 30.25, 9.0, 17.75, 4.5]
+    accumulators = {}
+    for value in values:
+        analyzer.add_value(accumulators, 'k', value)
+
+    count, total, m2, min_value, max_value = accumulators['k']
+    online = analyzer.statistics_from_moments(count, total / count, m2, min_value, max_value)
+    batch = analyzer.compute_statistics(values)
+
+    assert online['count'] == batch['count'] == 6
+    assert online['average'] == batch['average']
+    assert online['min'] == 4.5 and online['max'] == 30.25
+    assert math.isclose(online['std_dev'], batch['std_dev'], rel_tol=1e-12)
+
+
+def test_row_filter_date_range_matches_should_include():
+    args = SimpleNamespace(
+        site=None, device=None, metric=None,
+        start_date=analyzer.parse_datetime("2025-01-01 00:05:00"),
+        end_date=analyzer.parse_datetime("2025-01-01 01:00:00"),
+    )
+    row_filter = analyzer.build_row_filter(args)
+    times = [
+        "2025-01-01 00:04:59 +0000 UTC",
+        "2025-01-01 00:05:00 +0000 UTC",
+        "2025-01-01 00:30:00",
+        "2025-01-01 01:00:01 +0000 UTC",
+        "2025-01-01 01:30:00 +0100 UTC",
+        "2025-01-01 00:30:00 -0100 UTC",
+        " 2025-01-01 00:30:00 +0000 UTC",
+        "2025-13-01 00:30:00 +0000 UTC",
+        "2025-01-01 00:61:00 +0000 UTC",
+        "2025-01-01",
+        "garbage",
+    ]
+    expected = [False, True, True, False, True, False, True, False, False, False, False]
+
+    for time, include in zip(times, expected):
+        row = {'time': time, 'site': 's', 'device': 'd', 'metric': 'm'}
+        assert analyzer.should_include(row, args) is include, time
+        assert row_filter(time, 's', 'd', 'm') is include, time
+
+
+def test_row_filter_start_date_before_year_1000():
+    start = analyzer.parse_datetime("0999-01-01")
+    assert analyzer.time_sort_key(start) == "0999-01-01 00:00:00"
+
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=start, end_date=None)
+    row_filter = analyzer.build_row_filter(args)
+    assert row_filter("2025-01-01 00:00:00 +0000 UTC", 's', 'd', 'm') is True
+    assert row_filter("0998-12-31 23:59:59 +0000 UTC", 's', 'd', 'm') is False
+
+
+def test_aggregate_file_parallel_chunks_match_serial(tmp_path):
+    lines = ["time,site,device,metric,unit,value"]
+    for i in range(300):
+        lines.append(f"2025-01-01 00:{i % 60:02d}:00 +0000 UTC,site_{i % 3},dev_{i % 7},temp,Cel,{(i * 37) % 101 / 4}")
+    csv_path = tmp_path / "many.csv"
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    args = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    serial = analyzer.compute_group_stats(analyzer.aggregate_file(str(csv_path), args))
+    parallel = analyzer.compute_group_stats(
+        analyzer.aggregate_file(str(csv_path), args, jobs=2, chunk_size=1024)
+    )
+
+    assert list(parallel) == list(serial)
+    for key, s in serial.items():
+        p = parallel[key]
+        assert p['count'] == s['count']
+        assert p['min'] == s['min'] and p['max'] == s['max']
+        assert math.isclose(p['average'], s['average'], rel_tol=1e-12)
+        assert math.isclose(p['std_dev'], s['std_dev'], rel_tol=1e-9)
+
+
+def test_sorted_by_time_stops_after_end_date(tmp_path):
+    csv_text = (
+        "time,site,device,metric,unit,value\n"
+        "2025-01-01 00:00:00 +0000 UTC,site_1,dev_1,temp,Cel,10.0\n"
+        "2025-01-01 00:05:00 +0000 UTC,site_1,dev_1,temp,Cel,20.0\n"
+        "2025-01-01 00:10:00 +0000 UTC,site_1,dev_1,temp,Cel,30.0\n"
+        # out of order on purpose: only reached when the scan doesn't stop
+        "2025-01-01 00:01:00 +0000 UTC,site_1,dev_1,temp,Cel,40.0\n"
+    )
+    csv_path = tmp_path / "sorted.csv"
+    csv_path.write_text(csv_text, encoding="utf-8")
+
+    args = SimpleNamespace(
+        site=None, device=None, metric=None,
+        start_date=None, end_date=analyzer.parse_datetime("2025-01-01 00:05:00"),
+        sorted_by_time=False,
+    )
+    full = analyzer.aggregate_file(str(csv_path), args)
+    args.sorted_by_time = True
+    pruned = analyzer.aggregate_file(str(csv_path), args)
+
+    assert full[('dev_1', 'site_1', 'temp')][0] == 3
+    assert pruned[('dev_1', 'site_1', 'temp')][0] == 2
+
+
+def test_select_top_groups_orders_and_keeps_ties_stable():
+    stats = {}
+    for i, (average, std_dev) in enumerate([(1.0, 0.5), (3.0, 0.1), (2.0, 0.5), (3.0, 0.9)]):
+        stats[(f'dev_{i}', 'site', 'm')] = {'average': average, 'std_dev': std_dev}
+
+    top_by_avg, top_by_stddev = analyzer.select_top_groups(stats, 3)
+
+    assert [key[0] for key, _ in top_by_avg] == ['dev_1', 'dev_3', 'dev_2']
+    assert [key[0] for key, _ in top_by_stddev] == ['dev_3', 'dev_0', 'dev_2']
+
+
+def test_build_row_filter_only_checks_active_filters():
+    no_filters = SimpleNamespace(site=None, device=None, metric=None, start_date=None, end_date=None)
+    assert analyzer.build_row_filter(no_filters) is None
+
+    args = SimpleNamespace(site='site_1', device=None, metric='temp', start_date=None, end_date=None)
+    row_filter = analyzer.build_row_filter(args)
+
+    assert row_filter('not a date', 'site_1', 'any_device', 'temp') is True
+    assert row_filter('not a date', 'site_2', 'any_device', 'temp') is False
+    assert row_filter('not a date', 'site_1', 'any_device', 'humidity') is False